@@ -11,8 +11,11 @@ from typing import List, Optional, Dict, Any, Union
 import uvicorn
 import os
 import logging
+import logging.handlers
+import queue
 from datetime import datetime, timedelta
 import asyncio
+import threading
 import uuid
 import json
 from enum import Enum
@@ -27,8 +30,12 @@ import sys
 sys.path.append('/home/oss/002AIC/libs/auth-middleware/python')
 from auth_middleware import FastAPIAuthMiddleware, AuthConfig
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging; request handlers only enqueue records and a background
+# listener thread performs the stdout writes
+log_queue = queue.SimpleQueue()
+log_listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler())
+logging.basicConfig(level=logging.INFO, handlers=[logging.handlers.QueueHandler(log_queue)])
+log_listener.start()
 logger = logging.getLogger(__name__)
 
 # Initialize FastAPI app
@@ -175,8 +182,31 @@ def init_redis():
         decode_responses=True
     )
 
+def init_celery_broker():
+    # One long-lived broker connection, opened lazily on first use and
+    # re-established by ensure_connection() if it drops
+    return celery_app.connection_for_write()
+
+def check_celery_broker():
+    # ensure_connection() alone returns immediately once the connection has
+    # been marked connected, so follow it with a real round-trip to Redis
+    with broker_lock:
+        broker_connection.ensure_connection(max_retries=1)
+        broker_connection.default_channel.client.ping()
+
 postgres_engine, SessionLocal = init_postgres()
 redis_client = init_redis()
+broker_connection = init_celery_broker()
+broker_lock = threading.Lock()
+
+@app.on_event("shutdown")
+async def close_celery_broker():
+    broker_connection.release()
+
+@app.on_event("shutdown")
+async def stop_log_listener():
+    # Flush any queued records before the process exits
+    log_listener.stop()
 
 # Health check endpoint
 @app.get("/health")
@@ -197,7 +227,7 @@ async def health_check():
         redis_healthy = False
     
     try:
-        celery_app.control.inspect().active()
+        await asyncio.to_thread(check_celery_broker)
     except Exception:
         celery_healthy = False
     
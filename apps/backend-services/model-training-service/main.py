@@ -6,23 +6,48 @@ Handles ML model training, hyperparameter tuning, and experiment tracking
 import os
 import asyncio
 import logging
+import time
 from datetime import datetime
 from typing import List, Optional, Dict, Any, Union
 from contextlib import asynccontextmanager
 import json
+import tempfile
 import uuid
 
 import uvicorn
-from fastapi import FastAPI, HTTPException, BackgroundTasks, UploadFile, File
+from fastapi import FastAPI, HTTPException, BackgroundTasks, UploadFile, File, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
 import mlflow
 import mlflow.sklearn
 import mlflow.tensorflow
 import mlflow.pytorch
+from mlflow.entities import Metric, Param, ViewType
+from mlflow.models import Model
+from mlflow.tracking import MlflowClient
+from mlflow.tracking.context.registry import resolve_tags
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, GridSearchCV, RandomizedSearchCV
+
+# Route the estimators this service trains through Intel's oneDAL kernels
+# when scikit-learn-intelex is installed; must run before sklearn imports
+if os.getenv("SKLEARNEX_ENABLED", "true").lower() == "true":
+    try:
+        from sklearnex import patch_sklearn
+        patch_sklearn([
+            "train_test_split",
+            "RandomForestClassifier",
+            "RandomForestRegressor",
+            "LogisticRegression",
+            "LinearRegression",
+            "SVC",
+            "SVR"
+        ])
+    except ImportError:
+        pass
+
+from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV, RandomizedSearchCV
 from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
 from sklearn.linear_model import LogisticRegression, LinearRegression
 from sklearn.svm import SVC, SVR
@@ -30,12 +55,16 @@ from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_sc
 import optuna
 import redis
 import httpx
+from cachetools import TTLCache
 
 # Configuration
 REDIS_URL = os.getenv("REDIS_URL", "redis://:nexus-password@redis:6379/0")
 MLFLOW_TRACKING_URI = os.getenv("MLFLOW_TRACKING_URI", "http://mlflow-server:5000")
+MLFLOW_EXPERIMENT_ID = os.getenv("MLFLOW_EXPERIMENT_ID", "0")
 MODEL_MANAGEMENT_URL = os.getenv("MODEL_MANAGEMENT_URL", "http://model-management-service:8086")
 SERVICE_PORT = int(os.getenv("PORT", "8087"))
+EXPERIMENTS_PAGE_SIZE = int(os.getenv("EXPERIMENTS_PAGE_SIZE", "100"))
+EXPERIMENTS_CACHE_TTL = float(os.getenv("EXPERIMENTS_CACHE_TTL", "5"))
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -46,6 +75,17 @@ redis_client = redis.from_url(REDIS_URL, decode_responses=True)
 
 # MLflow setup
 mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+mlflow_client = MlflowClient()
+
+# Shared HTTP client for calls to other platform services
+http_client = httpx.AsyncClient()
+
+# Short-lived cache of experiment listing pages, keyed by page size and token.
+# Bounded, since both parts of the key come from the caller.
+experiments_cache = TTLCache(maxsize=256, ttl=EXPERIMENTS_CACHE_TTL)
+
+def invalidate_experiments_cache():
+    experiments_cache.clear()
 
 # Pydantic Models
 class TrainingJobCreate(BaseModel):
@@ -94,8 +134,21 @@ class ExperimentResponse(BaseModel):
     tags: Optional[Dict[str, str]]
     created_at: datetime
 
-# Training job storage
+# Training job storage, with a secondary index of job IDs by status
 training_jobs = {}
+jobs_by_status: Dict[str, Dict[str, None]] = {}
+
+def store_training_job(job_id: str, job_data: Dict[str, Any]):
+    """Store a job and add it to the status index"""
+    training_jobs[job_id] = job_data
+    jobs_by_status.setdefault(job_data["status"], {})[job_id] = None
+
+def set_job_status(job_id: str, status: str):
+    """Move a job to a new status, keeping the status index in step"""
+    job_data = training_jobs[job_id]
+    jobs_by_status.get(job_data["status"], {}).pop(job_id, None)
+    job_data["status"] = status
+    jobs_by_status.setdefault(status, {})[job_id] = None
 
 # Lifespan context manager
 @asynccontextmanager
@@ -119,13 +172,15 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("🛑 Model Training Service shutting down...")
+    await http_client.aclose()
 
 # Create FastAPI app
 app = FastAPI(
     title="Nexus Model Training Service",
     description="ML Model Training and Hyperparameter Tuning for Nexus Platform",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -135,6 +190,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Page-Token"],
 )
 
 # Health check endpoint
@@ -158,11 +214,13 @@ async def create_experiment(experiment: ExperimentCreate):
     """Create a new MLflow experiment"""
     try:
         # Create experiment in MLflow
-        experiment_id = mlflow.create_experiment(
-            name=experiment.experiment_name,
+        experiment_id = await asyncio.to_thread(
+            mlflow_client.create_experiment,
+            experiment.experiment_name,
             tags=experiment.tags
         )
         
+        invalidate_experiments_cache()
         logger.info(f"✅ Created experiment: {experiment.experiment_name}")
         
         return ExperimentResponse(
@@ -178,21 +236,48 @@ async def create_experiment(experiment: ExperimentCreate):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/experiments", response_model=List[ExperimentResponse])
-async def list_experiments():
-    """List all MLflow experiments"""
+async def list_experiments(
+    response: Response,
+    max_results: int = Query(EXPERIMENTS_PAGE_SIZE, ge=1, le=1000),
+    page_token: Optional[str] = None
+):
+    """List active MLflow experiments, newest first.
+    
+    Results are paged; when more experiments remain, the token for the next
+    page is returned in the X-Next-Page-Token header.
+    """
     try:
-        experiments = mlflow.search_experiments()
-        
-        return [
-            ExperimentResponse(
-                experiment_id=exp.experiment_id,
-                name=exp.name,
-                description=exp.tags.get("description"),
-                tags=exp.tags,
-                created_at=datetime.fromtimestamp(exp.creation_time / 1000)
+        cache_key = (max_results, page_token)
+        cached = experiments_cache.get(cache_key)
+        if cached is not None:
+            experiment_rows, next_page_token = cached
+        else:
+            # Let the tracking server order and page the result set, and
+            # keep the blocking HTTP round-trip off the event loop
+            experiments = await asyncio.to_thread(
+                mlflow_client.search_experiments,
+                view_type=ViewType.ACTIVE_ONLY,
+                max_results=max_results,
+                order_by=["creation_time DESC"],
+                page_token=page_token
             )
-            for exp in experiments
-        ]
+            
+            experiment_rows = [
+                ExperimentResponse(
+                    experiment_id=exp.experiment_id,
+                    name=exp.name,
+                    description=exp.tags.get("description"),
+                    tags=exp.tags,
+                    created_at=datetime.fromtimestamp(exp.creation_time / 1000)
+                )
+                for exp in experiments
+            ]
+            next_page_token = experiments.token
+            experiments_cache[cache_key] = (experiment_rows, next_page_token)
+        
+        if next_page_token:
+            response.headers["X-Next-Page-Token"] = next_page_token
+        return experiment_rows
         
     except Exception as e:
         logger.error(f"❌ Error listing experiments: {e}")
@@ -244,7 +329,7 @@ async def create_training_job(
         }
         
         # Store in memory and Redis
-        training_jobs[job_id] = training_job
+        store_training_job(job_id, training_job)
         redis_client.setex(f"training_job:{job_id}", 86400, json.dumps(training_job, default=str))
         
         # Start training in background
@@ -262,12 +347,8 @@ async def create_training_job(
 async def list_training_jobs(status: Optional[str] = None):
     """List all training jobs"""
     try:
-        jobs = []
-        for job_id, job_data in training_jobs.items():
-            if status is None or job_data["status"] == status:
-                jobs.append(TrainingJobResponse(**job_data))
-        
-        return jobs
+        job_ids = training_jobs if status is None else jobs_by_status.get(status, {})
+        return [TrainingJobResponse(**training_jobs[job_id]) for job_id in job_ids]
         
     except Exception as e:
         logger.error(f"❌ Error listing training jobs: {e}")
@@ -286,7 +367,7 @@ async def get_training_job(job_id: str):
                 for date_field in ["created_at", "started_at", "completed_at"]:
                     if job_data[date_field]:
                         job_data[date_field] = datetime.fromisoformat(job_data[date_field])
-                training_jobs[job_id] = job_data
+                store_training_job(job_id, job_data)
             else:
                 raise HTTPException(status_code=404, detail="Training job not found")
         
@@ -302,7 +383,7 @@ async def run_training_job(job_id: str):
     """Run the training job asynchronously"""
     try:
         job_data = training_jobs[job_id]
-        job_data["status"] = "running"
+        set_job_status(job_id, "running")
         job_data["started_at"] = datetime.utcnow()
         
         logger.info(f"🏃 Starting training job: {job_id}")
@@ -333,14 +414,23 @@ async def run_training_job(job_id: str):
             stratify=y if job_data["model_type"] == "classifier" else None
         )
         
-        # Start MLflow run
-        with mlflow.start_run(run_name=f"{job_data['job_name']}_{job_id}"):
-            # Log parameters
-            mlflow.log_param("algorithm", job_data["algorithm"])
-            mlflow.log_param("model_type", job_data["model_type"])
-            mlflow.log_param("dataset_shape", df.shape)
-            mlflow.log_param("test_size", job_data["test_size"])
-            mlflow.log_param("cv_folds", job_data["cv_folds"])
+        # Start MLflow run. The run is addressed by ID through the client
+        # rather than the fluent active-run stack, which is shared by every
+        # job on the event loop and would mix up concurrent jobs' runs.
+        # Tracking calls are blocking HTTP requests, so they run in threads.
+        mlflow_run_id = await asyncio.to_thread(
+            start_mlflow_run, f"{job_data['job_name']}_{job_id}"
+        )
+        
+        try:
+            # Log parameters in one request rather than one per parameter
+            await asyncio.to_thread(mlflow_client.log_batch, mlflow_run_id, params=[
+                Param("algorithm", str(job_data["algorithm"])),
+                Param("model_type", str(job_data["model_type"])),
+                Param("dataset_shape", str(df.shape)),
+                Param("test_size", str(job_data["test_size"])),
+                Param("cv_folds", str(job_data["cv_folds"]))
+            ])
             
             # Get model and hyperparameters
             model, param_grid = get_model_and_params(
@@ -378,16 +468,13 @@ async def run_training_job(job_id: str):
                     )
                 
                 if job_data["tuning_method"] in ["grid_search", "random_search"]:
-                    search.fit(X_train, y_train)
+                    await asyncio.to_thread(search.fit, X_train, y_train)
                     best_model = search.best_estimator_
                     best_params = search.best_params_
                     
-                    # Log best parameters
-                    mlflow.log_params(best_params)
-                    
             else:
-                # Train with default parameters
-                best_model.fit(X_train, y_train)
+                # Train with default parameters, off the event loop
+                await asyncio.to_thread(best_model.fit, X_train, y_train)
             
             # Make predictions
             y_pred = best_model.predict(X_test)
@@ -408,34 +495,43 @@ async def run_training_job(job_id: str):
                     "r2_score": r2_score(y_test, y_pred)
                 }
             
-            # Log metrics
-            mlflow.log_metrics(metrics)
+            # Log metrics and tuned parameters in a single request
+            timestamp = time.time_ns() // 1_000_000
+            await asyncio.to_thread(
+                mlflow_client.log_batch,
+                mlflow_run_id,
+                metrics=[Metric(key, float(value), timestamp, 0) for key, value in metrics.items()],
+                params=[Param(key, str(value)) for key, value in best_params.items()]
+            )
             
             # Log model
             if job_data["algorithm"] in ["random_forest", "logistic_regression", "linear_regression", "svm"]:
-                mlflow.sklearn.log_model(best_model, "model")
-            
-            # Get MLflow run info
-            run = mlflow.active_run()
-            mlflow_run_id = run.info.run_id
+                await asyncio.to_thread(log_sklearn_model, mlflow_run_id, best_model)
             
             # Register model with Model Management Service
             model_id = await register_model_with_management_service(
                 job_data, best_model, metrics, best_params, mlflow_run_id
             )
             
+            await asyncio.to_thread(mlflow_client.set_terminated, mlflow_run_id)
+            
             # Update job status
-            job_data["status"] = "completed"
+            set_job_status(job_id, "completed")
             job_data["completed_at"] = datetime.utcnow()
             job_data["metrics"] = metrics
             job_data["best_parameters"] = best_params
             job_data["model_id"] = model_id
+            invalidate_experiments_cache()
             
             logger.info(f"✅ Training job completed: {job_id}")
             
+        except Exception:
+            await asyncio.to_thread(mlflow_client.set_terminated, mlflow_run_id, status="FAILED")
+            raise
+            
     except Exception as e:
         logger.error(f"❌ Training job failed: {job_id} - {e}")
-        job_data["status"] = "failed"
+        set_job_status(job_id, "failed")
         job_data["completed_at"] = datetime.utcnow()
         job_data["error_message"] = str(e)
     
@@ -443,6 +539,26 @@ async def run_training_job(job_id: str):
         # Update Redis cache
         redis_client.setex(f"training_job:{job_id}", 86400, json.dumps(job_data, default=str))
 
+def start_mlflow_run(run_name: str) -> str:
+    """Create a run with the same system tags fluent start_run records"""
+    run = mlflow_client.create_run(
+        MLFLOW_EXPERIMENT_ID,
+        run_name=run_name,
+        tags=resolve_tags()
+    )
+    return run.info.run_id
+
+def log_sklearn_model(run_id: str, model):
+    """Save a scikit-learn model in MLflow format and upload it to a run"""
+    mlflow_model = Model(artifact_path="model", run_id=run_id)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = os.path.join(tmp_dir, "model")
+        mlflow.sklearn.save_model(model, model_path, mlflow_model=mlflow_model)
+        mlflow_client.log_artifacts(run_id, model_path, "model")
+    # Add the model to the run's mlflow.log-model.history tag, as log_model
+    # does, so the tracking UI lists it
+    mlflow_client._record_logged_model(run_id, mlflow_model)
+
 def get_model_and_params(algorithm: str, model_type: str, custom_params: Optional[Dict] = None):
     """Get model instance and parameter grid for hyperparameter tuning"""
     
@@ -507,70 +623,78 @@ def get_model_and_params(algorithm: str, model_type: str, custom_params: Optiona
 async def run_optuna_optimization(model, X_train, y_train, param_grid, job_data):
     """Run Optuna hyperparameter optimization"""
     
+    # Resolve how each parameter is sampled once, rather than on every trial
+    suggestions = []
+    for param, values in param_grid.items():
+        if isinstance(values[0], int):
+            suggestions.append((param, "suggest_int", (min(values), max(values))))
+        elif isinstance(values[0], float):
+            suggestions.append((param, "suggest_float", (min(values), max(values))))
+        else:
+            suggestions.append((param, "suggest_categorical", (values,)))
+    
+    cv_folds = job_data["cv_folds"]
+    scoring = 'accuracy' if job_data["model_type"] == "classifier" else 'r2'
+    
     def objective(trial):
         # Suggest parameters based on param_grid
-        params = {}
-        for param, values in param_grid.items():
-            if isinstance(values[0], int):
-                params[param] = trial.suggest_int(param, min(values), max(values))
-            elif isinstance(values[0], float):
-                params[param] = trial.suggest_float(param, min(values), max(values))
-            else:
-                params[param] = trial.suggest_categorical(param, values)
+        params = {
+            param: getattr(trial, method)(param, *args)
+            for param, method, args in suggestions
+        }
         
         # Set model parameters
         model.set_params(**params)
         
         # Cross-validation
-        from sklearn.model_selection import cross_val_score
         scores = cross_val_score(
             model, X_train, y_train, 
-            cv=job_data["cv_folds"],
-            scoring='accuracy' if job_data["model_type"] == "classifier" else 'r2'
+            cv=cv_folds,
+            scoring=scoring
         )
         
         return scores.mean()
     
-    # Create study
+    # Create study; trials and the final fit run in a worker thread so the
+    # event loop keeps serving requests while the search runs
     study = optuna.create_study(direction='maximize')
-    study.optimize(objective, n_trials=100, timeout=600)  # 10 minutes timeout
+    await asyncio.to_thread(study.optimize, objective, n_trials=100, timeout=600)  # 10 minutes timeout
     
     # Get best parameters and retrain model
     best_params = study.best_params
     model.set_params(**best_params)
-    model.fit(X_train, y_train)
+    await asyncio.to_thread(model.fit, X_train, y_train)
     
     return model, best_params
 
 async def register_model_with_management_service(job_data, model, metrics, best_params, mlflow_run_id):
     """Register the trained model with the Model Management Service"""
     try:
-        async with httpx.AsyncClient() as client:
-            model_data = {
-                "name": job_data["job_name"],
-                "framework": "sklearn",
-                "model_type": job_data["model_type"],
-                "description": f"Model trained with {job_data['algorithm']}",
-                "tags": {
-                    "algorithm": job_data["algorithm"],
-                    "training_job_id": job_data["job_id"]
-                },
-                "mlflow_run_id": mlflow_run_id
-            }
-            
-            response = await client.post(
-                f"{MODEL_MANAGEMENT_URL}/models",
-                json=model_data
-            )
+        model_data = {
+            "name": job_data["job_name"],
+            "framework": "sklearn",
+            "model_type": job_data["model_type"],
+            "description": f"Model trained with {job_data['algorithm']}",
+            "tags": {
+                "algorithm": job_data["algorithm"],
+                "training_job_id": job_data["job_id"]
+            },
+            "mlflow_run_id": mlflow_run_id
+        }
+        
+        response = await http_client.post(
+            f"{MODEL_MANAGEMENT_URL}/models",
+            json=model_data
+        )
+        
+        if response.status_code == 200:
+            model_info = response.json()
+            logger.info(f"✅ Model registered: {model_info['id']}")
+            return model_info["id"]
+        else:
+            logger.error(f"❌ Failed to register model: {response.text}")
+            return None
             
-            if response.status_code == 200:
-                model_info = response.json()
-                logger.info(f"✅ Model registered: {model_info['id']}")
-                return model_info["id"]
-            else:
-                logger.error(f"❌ Failed to register model: {response.text}")
-                return None
-                
     except Exception as e:
         logger.error(f"❌ Error registering model: {e}")
         return None
@@ -583,8 +707,7 @@ async def get_metrics():
         # Count jobs by status
         status_counts = {}
         for status in ["queued", "running", "completed", "failed"]:
-            count = sum(1 for job in training_jobs.values() if job["status"] == status)
-            status_counts[f"jobs_{status}"] = count
+            status_counts[f"jobs_{status}"] = len(jobs_by_status.get(status, {}))
         
         return {
             "service": "model-training-service",
@@ -13,6 +13,7 @@ import os
 import logging
 from datetime import datetime, timedelta
 import asyncio
+import threading
 import uuid
 import json
 import numpy as np
@@ -132,6 +133,7 @@ class AutoMLRequest(BaseModel):
     feature_engineering: bool = Field(default=True, description="Enable feature engineering")
     ensemble: bool = Field(default=True, description="Enable ensemble methods")
     interpretability: str = Field(default="medium", description="Model interpretability level")
+    parallel_trials: int = Field(default=4, ge=1, description="Number of algorithms trained concurrently")
 
 class TuningJobResponse(BaseModel):
     id: str
@@ -163,6 +165,10 @@ class TrialResult(BaseModel):
 # Storage for tuning jobs
 tuning_jobs = {}
 optuna_studies = {}
+cancel_events = {}
+
+# Shared random generator for simulated training runs
+rng = np.random.default_rng()
 
 # Health check endpoint
 @app.get("/health")
@@ -244,6 +250,7 @@ async def create_tuning_job(
         }
         
         tuning_jobs[job_id] = job_data
+        cancel_events[job_id] = threading.Event()
         
         # Queue tuning job
         background_tasks.add_task(execute_tuning_job, job_id, job_request)
@@ -317,6 +324,7 @@ async def cancel_tuning_job(job_id: str):
         
         job_data["status"] = TuningStatus.CANCELLED.value
         job_data["completed_at"] = datetime.utcnow()
+        cancel_events[job_id].set()
         
         return {"message": "Tuning job cancelled successfully"}
     except HTTPException:
@@ -371,6 +379,9 @@ async def execute_tuning_job(job_id: str, job_request: TuningJobRequest):
         
         # Update job status
         job_data = tuning_jobs[job_id]
+        cancel_event = cancel_events[job_id]
+        if cancel_event.is_set():
+            return
         job_data["status"] = TuningStatus.RUNNING.value
         job_data["started_at"] = datetime.utcnow()
         
@@ -391,8 +402,8 @@ async def execute_tuning_job(job_id: str, job_request: TuningJobRequest):
         
         # Define objective function
         def objective(trial):
-            # Check if job was cancelled
-            if tuning_jobs[job_id]["status"] == TuningStatus.CANCELLED.value:
+            # Check if job was cancelled while trials were in flight
+            if cancel_event.is_set():
                 raise optuna.TrialPruned()
             
             # Suggest parameters based on parameter space
@@ -440,14 +451,25 @@ async def execute_tuning_job(job_id: str, job_request: TuningJobRequest):
             
             return score
         
-        # Run optimization
-        study.optimize(
+        def stop_if_cancelled(study, trial):
+            if cancel_event.is_set():
+                study.stop()
+        
+        # Run optimization off the event loop so cancel requests are served
+        # while it runs; the callback ends the study as soon as one arrives
+        await asyncio.to_thread(
+            study.optimize,
             objective,
             n_trials=job_request.n_trials,
             timeout=job_request.timeout_seconds,
-            n_jobs=job_request.n_jobs
+            n_jobs=job_request.n_jobs,
+            callbacks=[stop_if_cancelled]
         )
         
+        if cancel_event.is_set():
+            logger.info(f"Tuning job {job_id} cancelled after {len(study.trials)} trials")
+            return
+        
         # Complete the job
         job_data["status"] = TuningStatus.COMPLETED.value
         job_data["completed_at"] = datetime.utcnow()
@@ -469,6 +491,8 @@ async def execute_tuning_job(job_id: str, job_request: TuningJobRequest):
         job_data["completed_at"] = datetime.utcnow()
         if job_data["started_at"]:
             job_data["duration_seconds"] = int((job_data["completed_at"] - job_data["started_at"]).total_seconds())
+    finally:
+        cancel_events.pop(job_id, None)
 
 async def execute_automl_job(job_id: str, automl_request: AutoMLRequest):
     """Background task to execute AutoML job"""
@@ -480,43 +504,60 @@ async def execute_automl_job(job_id: str, automl_request: AutoMLRequest):
             "random_forest", "svm", "neural_network", "gradient_boosting"
         ]
         
-        leaderboard = []
+        semaphore = asyncio.Semaphore(automl_request.parallel_trials)
+        models_tried = 0
         
-        for i, algorithm in enumerate(algorithms):
-            # Simulate model training
-            await asyncio.sleep(5)  # Simulate training time
+        async def train_candidate(algorithm: str) -> Dict[str, Any]:
+            nonlocal models_tried
+            
+            async with semaphore:
+                # Simulate model training
+                await asyncio.sleep(5)  # Simulate training time
             
-            # Generate mock performance metrics
+            # Generate mock performance metrics, training time and model size
+            # in a single draw
             if automl_request.problem_type == "classification":
-                score = np.random.uniform(0.75, 0.95)
+                score, precision, recall, f1, training_time, model_size_mb = rng.uniform(
+                    [0.75, 0.7, 0.7, 0.7, 10, 1],
+                    [0.95, 0.9, 0.9, 0.9, 300, 50]
+                ).tolist()
                 metrics = {
                     "accuracy": score,
-                    "precision": np.random.uniform(0.7, 0.9),
-                    "recall": np.random.uniform(0.7, 0.9),
-                    "f1_score": np.random.uniform(0.7, 0.9)
+                    "precision": precision,
+                    "recall": recall,
+                    "f1_score": f1
                 }
             else:  # regression
-                score = np.random.uniform(0.1, 0.5)  # Lower is better for RMSE
+                # Lower is better for RMSE
+                score, mae, r2, training_time, model_size_mb = rng.uniform(
+                    [0.1, 0.05, 0.7, 10, 1],
+                    [0.5, 0.3, 0.95, 300, 50]
+                ).tolist()
                 metrics = {
                     "rmse": score,
-                    "mae": np.random.uniform(0.05, 0.3),
-                    "r2_score": np.random.uniform(0.7, 0.95)
+                    "mae": mae,
+                    "r2_score": r2
                 }
             
             model_result = {
                 "algorithm": algorithm,
                 "score": score,
                 "metrics": metrics,
-                "training_time": np.random.uniform(10, 300),
-                "model_size_mb": np.random.uniform(1, 50)
+                "training_time": training_time,
+                "model_size_mb": model_size_mb
             }
             
-            leaderboard.append(model_result)
-            
             # Update progress
-            progress = ((i + 1) / len(algorithms)) * 100
+            models_tried += 1
+            progress = (models_tried / len(algorithms)) * 100
             
             logger.info(f"AutoML job {job_id} - Completed {algorithm}, Score: {score:.4f}")
+            return model_result
+        
+        # Train up to parallel_trials candidates at a time
+        leaderboard = list(await asyncio.gather(
+            *(train_candidate(algorithm) for algorithm in algorithms)
+        ))
         
         # Sort leaderboard by score
         if automl_request.problem_type == "classification":
@@ -549,15 +590,17 @@ def simulate_model_training(params: Dict[str, Any], job_request: TuningJobReques
     # Generate a score based on parameters (mock optimization landscape)
     base_score = 0.8
     
-    # Add some parameter-dependent variation
-    for param_name, param_value in params.items():
-        if isinstance(param_value, (int, float)):
-            # Simulate parameter impact
-            normalized_value = (param_value - 0.5) ** 2  # Quadratic relationship
-            base_score += np.random.normal(0, 0.05) - normalized_value * 0.1
+    # Add some parameter-dependent variation, drawing the noise for all
+    # numeric parameters in one call
+    values = np.array(
+        [value for value in params.values() if isinstance(value, (int, float))],
+        dtype=np.float64
+    )
+    normalized_values = (values - 0.5) ** 2  # Quadratic relationship
+    base_score += (rng.normal(0, 0.05, size=values.size) - normalized_values * 0.1).sum()
     
     # Add noise
-    score = base_score + np.random.normal(0, 0.02)
+    score = base_score + rng.normal(0, 0.02)
     
     # Ensure score is in valid range
     if job_request.objective_metric in ["accuracy", "f1_score", "precision", "recall"]:
@@ -3,7 +3,9 @@ AI Services Authentication and Authorization Middleware for Python
 Supports FastAPI, Flask, and Django frameworks
 """
 
+import hashlib
 import json
+import threading
 import time
 from typing import Dict, List, Optional, Any, Callable
 from dataclasses import dataclass
@@ -22,6 +24,12 @@ class AuthConfig:
     jwt_audience: str
     service_name: str
     timeout: int = 10
+    cache_ttl: int = 60
+    negative_cache_ttl: int = 5
+    cache_max_size: int = 10000
+    # Caching authorization decisions delays revocations by up to this many
+    # seconds, so it is off unless a service opts in
+    permission_cache_ttl: int = 0
 
 
 @dataclass
@@ -49,6 +57,35 @@ class AuthorizationResponse:
     reason: Optional[str] = None
 
 
+class TTLCache:
+    """Small thread-safe cache with per-entry expiry"""
+    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: Dict[Any, Any] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key: Any) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+    
+    def set(self, key: Any, value: Any, ttl: float):
+        if ttl <= 0:
+            return
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_size:
+                # Evict the oldest insertion
+                del self._entries[next(iter(self._entries))]
+            self._entries[key] = (time.monotonic() + ttl, value)
+
+
 class AuthMiddleware:
     """Authentication and Authorization middleware for AI services"""
     
@@ -56,12 +93,28 @@ class AuthMiddleware:
         self.config = config
         self.session = requests.Session()
         self.session.timeout = config.timeout
+        # Every protected request validates the same few tokens; remember the
+        # decoded claims briefly. Failures are cached for a shorter time to
+        # absorb bursts of bad tokens without locking out a corrected one for
+        # long. Authorization decisions are only cached when
+        # permission_cache_ttl is set.
+        self.token_cache = TTLCache(config.cache_max_size)
+        self.permission_cache = TTLCache(config.cache_max_size)
         
     def validate_jwt(self, token: str) -> UserContext:
         """Validate JWT token and extract user context"""
         # Remove Bearer prefix if present
         token = token.replace("Bearer ", "")
         
+        cache_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        cached = self.token_cache.get(cache_key)
+        if isinstance(cached, str):
+            # Failures are cached as their message; raise a fresh error each
+            # time rather than re-raising one shared exception instance
+            raise ValueError(cached)
+        if cached is not None:
+            return cached
+        
         try:
             # In production, fetch and verify with Keycloak's public key
             # For now, we'll decode without verification for demo
@@ -75,15 +128,34 @@ class AuthMiddleware:
                 roles=decoded.get("realm_access", {}).get("roles", [])
             )
             
+            # Never cache a token past its own expiry. The claim is not
+            # verified, so ignore an exp that is not a number.
+            ttl = self.config.cache_ttl
+            exp = decoded.get("exp")
+            if isinstance(exp, (int, float)) and not isinstance(exp, bool):
+                ttl = min(ttl, exp - time.time())
+            self.token_cache.set(cache_key, user_context, ttl)
+            
             return user_context
             
         except PyJWTError as e:
-            raise ValueError(f"Invalid JWT token: {e}")
+            message = f"Invalid JWT token: {e}"
+            self.token_cache.set(cache_key, message, self.config.negative_cache_ttl)
+            raise ValueError(message)
     
     def check_permission(self, user_id: str, resource: str, action: str, 
                         context: Optional[Dict[str, Any]] = None) -> AuthorizationResponse:
         """Check if user has permission for resource and action"""
         
+        # Context-dependent decisions are never cached
+        cache_key = None
+        if self.config.permission_cache_ttl > 0 and not context:
+            cache_key = (user_id, resource, action)
+        if cache_key:
+            cached = self.permission_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
         request_data = {
             "user_id": user_id,
             "resource": resource,
@@ -105,10 +177,17 @@ class AuthMiddleware:
             
             if response.status_code == 200:
                 data = response.json()
-                return AuthorizationResponse(
+                auth_response = AuthorizationResponse(
                     allowed=data.get("allowed", False),
                     reason=data.get("reason")
                 )
+                if cache_key:
+                    ttl = (
+                        self.config.permission_cache_ttl if auth_response.allowed
+                        else min(self.config.negative_cache_ttl, self.config.permission_cache_ttl)
+                    )
+                    self.permission_cache.set(cache_key, auth_response, ttl)
+                return auth_response
             else:
                 return AuthorizationResponse(
                     allowed=False,